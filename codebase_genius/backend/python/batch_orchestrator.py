@@ -0,0 +1,347 @@
+#!/usr/bin/env python3
+"""
+Batch orchestrator for Codebase Genius - documents many repositories in one process.
+
+Each repository moves through three pipelined stages, each with its own pool:
+
+    clone   (thread pool, network/disk bound, checkouts from the WorkspaceManager)
+    parse   (process pool, CPU bound: file tree, regex parsing, code graph)
+    analyze (shared LLMScheduler, Gemini bound: every prompt queued at once)
+    render  (thread pool: markdown, site and JSON outputs)
+
+so one repository can be cloning while another is being parsed or analyzed.
+Hand-off between stages is bounded: a repository is only cloned or parsed
+when fewer than max_buffered repositories are waiting for the next stage, so
+a Gemini-bound analyze stage holds back cloning instead of piling up parsed
+repositories in memory. A checkout is released as soon as its parse stage
+finishes, so the workspace only holds repositories being cloned or parsed.
+Analysis does not hold a thread per repository: a parsed repository registers
+a job with the shared LLMScheduler and queues all its prompts, and the batch
+moves on once they have all resolved. Up to llm_workers repositories are
+analyzed at once, smallest planned workload first, and the scheduler shares
+Gemini fairly between them, so the Gemini limits apply to the batch as a
+whole and a large repository cannot starve the small ones. Progress is
+written to a JSON manifest after every stage transition; re-running with the
+same manifest skips repositories that already succeeded.
+"""
+
+import argparse
+import heapq
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
+from datetime import datetime, timezone
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
+
+from repo_parser import (
+    generate_file_tree, parse_code, build_graph, repo_output_key,
+    submit_code_analysis, submitted_futures, collect_code_analysis
+)
+from gemini_connector import GeminiConnector, RateLimiter
+from llm_scheduler import LLMScheduler
+from planner import plan_analysis, summarize_plan
+from renderers import render_docs
+from workspace import WorkspaceManager
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def load_repo_urls(urls_file: str) -> tuple:
+    """Read repository URLs, one per line, ignoring blanks and comments.
+
+    URLs that map to the same output directory as an earlier line (the same
+    repository spelled differently, e.g. with a trailing / or .git) are
+    returned separately as {duplicate_url: first_url} and are not processed.
+    """
+    urls = []
+    duplicates = {}
+    seen = {}
+    with open(urls_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            url = line.strip()
+            if not url or url.startswith('#'):
+                continue
+            key = repo_output_key(url)
+            if key in seen:
+                if url != seen[key]:
+                    duplicates[url] = seen[key]
+                continue
+            seen[key] = url
+            urls.append(url)
+    return urls, duplicates
+
+def load_manifest(manifest_path: str) -> dict:
+    """Load an existing manifest, or return an empty one."""
+    if not os.path.exists(manifest_path):
+        return {"repos": {}}
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def save_manifest(manifest: dict, manifest_path: str) -> None:
+    """Write the manifest atomically so a crash never leaves it half written."""
+    manifest["updated_at"] = _now()
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+def _clone_stage(repo_url: str, workspace: WorkspaceManager) -> tuple:
+    start = time.perf_counter()
+    repo_path = workspace.acquire(repo_url)
+    return repo_path, time.perf_counter() - start
+
+RENDER_WORKERS = 2
+
+def _parse_stage(repo_path: str, budget: dict) -> tuple:
+    start = time.perf_counter()
+    file_tree = generate_file_tree(repo_path)
+    code_context = parse_code(repo_path)
+    code_graph = build_graph(code_context)
+    plan = plan_analysis(code_context, code_graph, max_calls=budget.get("max_calls"),
+                         max_seconds=budget.get("max_seconds"), concurrency=budget.get("concurrency", 1))
+    return (file_tree, code_context, code_graph, plan), time.perf_counter() - start
+
+def _when_all(futures: list) -> Future:
+    """Return a Future resolving to (None, elapsed seconds) once every future is done."""
+    start = time.perf_counter()
+    combined = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            combined.set_result((None, time.perf_counter() - start))
+
+    if not futures:
+        combined.set_result((None, 0.0))
+    for future in futures:
+        future.add_done_callback(on_done)
+    return combined
+
+def _render_stage(repo_url: str, parsed: tuple, enhanced_context: dict, budget: dict) -> tuple:
+    start = time.perf_counter()
+    file_tree, _, code_graph, plan = parsed
+    rendered = render_docs(code_graph, repo_url, enhanced_context, file_tree,
+                           output_dir=budget.get("output_dir"), backends=budget.get("backends"))
+    outputs = {name: result["path"] for name, result in rendered.items()}
+    return (outputs, summarize_plan(plan)), time.perf_counter() - start
+
+def orchestrate_batch(urls_file: str, manifest_path: str, clone_workers: int = 4,
+                      parse_workers: int = None, llm_workers: int = 16,
+                      rate_limiter: RateLimiter = None, workspace: WorkspaceManager = None,
+                      job_deadline: float = None, max_llm_calls: int = None,
+                      time_budget: float = None, output_dir: str = None,
+                      output_formats: list = None, max_buffered: int = None) -> dict:
+    """Document every repository listed in urls_file and return the manifest."""
+    manifest = load_manifest(manifest_path)
+    repos = manifest.setdefault("repos", {})
+    manifest.setdefault("started_at", _now())
+
+    urls, duplicates = load_repo_urls(urls_file)
+    manifest["duplicates"] = duplicates
+    for url, first in duplicates.items():
+        print(f"[{url}] skipped: same repository as {first}", file=sys.stderr)
+
+    todo = []
+    for repo_url in urls:
+        entry = repos.get(repo_url)
+        if entry and entry.get("status") == "success":
+            continue
+        # Anything unfinished (including stages interrupted by a crash) restarts from clone
+        repos[repo_url] = {"status": "pending", "timings": {}, "attempts": (entry or {}).get("attempts", 0)}
+        todo.append(repo_url)
+    save_manifest(manifest, manifest_path)
+
+    if not todo:
+        return manifest
+
+    gemini_connector = GeminiConnector(rate_limiter=rate_limiter or RateLimiter())
+    scheduler = LLMScheduler(gemini_connector)
+    # Per-repository budget and render settings; Gemini workers are shared by the repositories analyzed at once
+    budget = {
+        "output_dir": output_dir,
+        "backends": output_formats,
+        "max_calls": max_llm_calls,
+        "max_seconds": time_budget,
+        "concurrency": max(1, scheduler.workers // llm_workers),
+        "deadline": job_deadline or time_budget,
+    }
+    workspace = workspace or WorkspaceManager()
+    parse_slots = parse_workers or os.cpu_count() or 1
+    max_buffered = max_buffered or llm_workers
+
+    def mark(repo_url: str, **fields):
+        repos[repo_url].update(fields)
+        manifest["workspace"] = workspace.metrics()
+        save_manifest(manifest, manifest_path)
+
+    try:
+        with ThreadPoolExecutor(max_workers=clone_workers) as clone_pool, \
+                ProcessPoolExecutor(max_workers=parse_workers) as parse_pool, \
+                ThreadPoolExecutor(max_workers=RENDER_WORKERS) as render_pool:
+            # Repositories only move forward when the next stage has room, so at most
+            # max_buffered checkouts and max_buffered parsed results wait between stages
+            queued = deque(todo)
+            cloned = deque()
+            # Parsed repositories waiting for analysis, smallest planned workload first
+            parsed = []
+            order = itertools.count()
+            # An analyze slot is held from job registration until rendering finishes
+            in_flight = {"clone": 0, "parse": 0, "analyze": 0}
+            pending = {}
+            started = {}
+            checkouts = {}
+            analyzing = {}
+
+            def fill():
+                while parsed and in_flight["analyze"] < llm_workers:
+                    _, _, repo_url, result = heapq.heappop(parsed)
+                    job = scheduler.register_job(repo_url, deadline_seconds=budget["deadline"])
+                    submitted = submit_code_analysis(result[1], job, result[3])
+                    analyzing[repo_url] = (job, result, submitted)
+                    in_flight["analyze"] += 1
+                    pending[_when_all(submitted_futures(submitted))] = (repo_url, "analyze")
+                    mark(repo_url, status="analyzing")
+                while cloned and in_flight["parse"] < parse_slots and in_flight["parse"] + len(parsed) < max_buffered:
+                    repo_url = cloned.popleft()
+                    in_flight["parse"] += 1
+                    pending[parse_pool.submit(_parse_stage, checkouts[repo_url], budget)] = (repo_url, "parse")
+                    mark(repo_url, status="parsing")
+                while queued and in_flight["clone"] < clone_workers and in_flight["clone"] + len(cloned) < max_buffered:
+                    repo_url = queued.popleft()
+                    started[repo_url] = time.perf_counter()
+                    repos[repo_url]["attempts"] += 1
+                    in_flight["clone"] += 1
+                    pending[clone_pool.submit(_clone_stage, repo_url, workspace)] = (repo_url, "clone")
+                    mark(repo_url, status="cloning")
+
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    repo_url, stage = pending.pop(future)
+                    if stage in ("clone", "parse"):
+                        in_flight[stage] -= 1
+                    timings = repos[repo_url]["timings"]
+                    try:
+                        result, elapsed = future.result()
+                        timings[stage] = round(elapsed, 3)
+                        if stage == "analyze":
+                            job, parsed_result, submitted = analyzing.pop(repo_url)
+                            enhanced_context = collect_code_analysis(parsed_result[1], submitted)
+                            llm_stats = job.stats()
+                            job.close()
+                            pending[render_pool.submit(_render_stage, repo_url, parsed_result,
+                                                       enhanced_context, budget)] = (repo_url, "render")
+                            mark(repo_url, status="rendering", llm=llm_stats)
+                            continue
+                    except Exception as e:
+                        if stage == "parse":
+                            workspace.release(checkouts.pop(repo_url), success=False)
+                        if stage in ("analyze", "render"):
+                            in_flight["analyze"] -= 1
+                            if repo_url in analyzing:
+                                analyzing.pop(repo_url)[0].close()
+                        timings["total"] = round(time.perf_counter() - started[repo_url], 3)
+                        print(f"[{repo_url}] {stage} failed: {e}", file=sys.stderr)
+                        mark(repo_url, status="error", failed_stage=stage, error=str(e), finished_at=_now())
+                        continue
+
+                    if stage == "clone":
+                        checkouts[repo_url] = result
+                        cloned.append(repo_url)
+                        mark(repo_url, status="cloned")
+                    elif stage == "parse":
+                        workspace.release(checkouts.pop(repo_url))
+                        plan = result[3]
+                        heapq.heappush(parsed, (summarize_plan(plan)["llm_calls"], next(order), repo_url, result))
+                        mark(repo_url, status="parsed", files=len(result[1]))
+                    else:
+                        in_flight["analyze"] -= 1
+                        timings["total"] = round(time.perf_counter() - started[repo_url], 3)
+                        print(f"[{repo_url}] done in {timings['total']}s", file=sys.stderr)
+                        outputs, plan_summary = result
+                        mark(repo_url, status="success", outputs=outputs, analysis_plan=plan_summary,
+                             error=None, finished_at=_now())
+                fill()
+    finally:
+        scheduler.shutdown()
+
+    return manifest
+
+def summarize_manifest(manifest: dict) -> dict:
+    """Count repositories per status."""
+    counts = {}
+    for entry in manifest.get("repos", {}).values():
+        counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+    return counts
+
+def main(argv: list = None):
+    """Entry point for `orchestrator.py --batch` and direct invocation."""
+    parser = argparse.ArgumentParser(description="Generate documentation for many repositories.")
+    parser.add_argument("urls_file", help="file with one repository URL per line")
+    parser.add_argument("--manifest", help="manifest path (default: <urls_file>.manifest.json)")
+    parser.add_argument("--clone-workers", type=int, default=4)
+    parser.add_argument("--parse-workers", type=int, default=None)
+    parser.add_argument("--llm-workers", type=int, default=16,
+                        help="repositories whose prompts are queued on the scheduler at the same time")
+    parser.add_argument("--max-buffered", type=int, default=None,
+                        help="repositories allowed to wait between stages (default: --llm-workers)")
+    parser.add_argument("--job-deadline", type=float, default=None, help="seconds each repository may spend on Gemini prompts")
+    parser.add_argument("--max-llm-calls", type=int, default=None, help="Gemini calls per repository; top-ranked files first")
+    parser.add_argument("--time-budget", type=float, default=None, help="seconds of Gemini analysis per repository; top-ranked files first")
+    parser.add_argument("--rpm", type=int, default=None, help="Gemini requests per minute for the whole batch")
+    parser.add_argument("--max-concurrent", type=int, default=None, help="Gemini requests in flight for the whole batch")
+    parser.add_argument("--output-dir", default=None, help="where docs are written (default: backend/outputs)")
+    parser.add_argument("--formats", default="markdown,site,json", help="comma-separated output backends")
+    parser.add_argument("--workspace-root", default=None, help="directory for cloned repositories")
+    parser.add_argument("--workspace-quota-mb", type=int, default=None, help="disk quota for cached checkouts")
+    parser.add_argument("--reuse-workspace", action="store_true", help="keep checkouts for warm repeat runs")
+    args = parser.parse_args(argv)
+
+    manifest_path = args.manifest or f"{args.urls_file}.manifest.json"
+    try:
+        manifest = orchestrate_batch(
+            args.urls_file, manifest_path,
+            clone_workers=args.clone_workers,
+            parse_workers=args.parse_workers,
+            llm_workers=args.llm_workers,
+            rate_limiter=RateLimiter(args.rpm, args.max_concurrent),
+            workspace=WorkspaceManager(
+                root=args.workspace_root,
+                quota_bytes=args.workspace_quota_mb * 1024 * 1024 if args.workspace_quota_mb else None,
+                reuse=args.reuse_workspace or None,
+            ),
+            job_deadline=args.job_deadline,
+            max_llm_calls=args.max_llm_calls,
+            time_budget=args.time_budget,
+            output_dir=args.output_dir,
+            output_formats=[f.strip() for f in args.formats.split(",") if f.strip()],
+            max_buffered=args.max_buffered,
+        )
+    except Exception as e:
+        print(json.dumps({"status": "error", "error": str(e)}))
+        sys.exit(1)
+
+    counts = summarize_manifest(manifest)
+    print(json.dumps({
+        "status": "success" if not counts.get("error") else "partial",
+        "manifest": manifest_path,
+        "counts": counts
+    }))
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,75 @@
 import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
 import google.generativeai as genai
 from typing import Optional, List
 
+class RateLimiter:
+    """Thread-safe limiter for Gemini calls shared by every job in a process.
+
+    Caps both the number of requests started in any rolling 60 second window
+    and the number of requests in flight at once.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, max_concurrent: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute or int(os.getenv("GEMINI_RPM", "60"))
+        self.max_concurrent = max_concurrent or int(os.getenv("GEMINI_MAX_CONCURRENT", "4"))
+        self._window = deque()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+
+    def acquire(self):
+        """Block until a request may be sent."""
+        self._slots.acquire()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._window and now - self._window[0] >= 60:
+                    self._window.popleft()
+                if len(self._window) < self.requests_per_minute:
+                    self._window.append(now)
+                    return
+                wait = 60 - (now - self._window[0])
+            time.sleep(wait)
+
+    def release(self):
+        self._slots.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
 class GeminiConnector:
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, rate_limiter: Optional[RateLimiter] = None):
         self.api_key = api_key or os.getenv("GEMINI_API_KEY")
         if not self.api_key:
             raise ValueError("GEMINI_API_KEY environment variable is required")
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel('gemini-2.5-flash')
+        self.rate_limiter = rate_limiter
+
+    def _limited(self):
+        """Return the context guarding a single API request."""
+        if self.rate_limiter is None:
+            return nullcontext()
+        return self.rate_limiter
 
     def generate_text(self, prompt: str, temperature: float = 0.7) -> str:
         """Generate text using Gemini API."""
         try:
-            response = self.model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=temperature,
+            with self._limited():
+                response = self.model.generate_content(
+                    prompt,
+                    generation_config=genai.types.GenerationConfig(
+                        temperature=temperature,
+                    )
                 )
-            )
             return response.text
         except Exception as e:
             raise Exception(f"Gemini API error: {str(e)}")
@@ -31,11 +82,12 @@ class GeminiConnector:
     def generate_embeddings(self, text: str) -> List[float]:
         """Generate embeddings for text using Gemini API."""
         try:
-            result = genai.embed_content(
-                model="models/embedding-001",
-                content=text,
-                task_type="retrieval_document"
-            )
+            with self._limited():
+                result = genai.embed_content(
+                    model="models/embedding-001",
+                    content=text,
+                    task_type="retrieval_document"
+                )
             return result['embedding']
         except Exception as e:
             raise Exception(f"Gemini embedding error: {str(e)}")
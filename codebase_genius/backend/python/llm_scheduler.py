@@ -0,0 +1,190 @@
+"""
+Shared scheduler for Gemini requests issued by concurrent documentation jobs.
+
+Every job gets its own queue. Worker threads pick the next request with
+weighted fair sharing (stride scheduling): each job has a virtual "pass" that
+advances by 1/weight per dispatched request, and the job with the lowest pass
+goes next. A small job that arrives behind a huge one is therefore served
+immediately instead of waiting for the huge job's backlog to drain. Within a
+job, file-level overview prompts run before function-level prompts, and once
+a job's deadline passes its remaining prompts are dropped.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+from typing import Optional
+
+from gemini_connector import GeminiConnector
+
+# Lower values are dispatched first within a job
+PRIORITY_FILE = 0
+PRIORITY_FUNCTION = 1
+
+class DeadlineExceeded(Exception):
+    """Raised for prompts dropped because their job ran past its deadline."""
+
+class _Job:
+    def __init__(self, job_id: str, weight: float, deadline: Optional[float], pass_value: float):
+        self.job_id = job_id
+        self.weight = weight
+        self.deadline = deadline
+        self.pass_value = pass_value
+        self.queue = []
+        self.dispatched = 0
+        self.dropped = 0
+
+    def expired(self, now: float) -> bool:
+        return self.deadline is not None and now >= self.deadline
+
+class JobHandle:
+    """Per-job view of the scheduler with the same generate_text API as GeminiConnector."""
+
+    def __init__(self, scheduler: "LLMScheduler", job_id: str):
+        self.scheduler = scheduler
+        self.job_id = job_id
+
+    def submit(self, prompt: str, temperature: float = 0.7, priority: int = PRIORITY_FUNCTION) -> Future:
+        """Queue a prompt and return a Future resolving to the generated text."""
+        return self.scheduler.submit(self.job_id, prompt, temperature, priority)
+
+    def generate_text(self, prompt: str, temperature: float = 0.7, priority: int = PRIORITY_FILE) -> str:
+        """Generate text, blocking until the scheduler has run the prompt."""
+        return self.submit(prompt, temperature, priority).result()
+
+    def stats(self) -> dict:
+        return self.scheduler.job_stats(self.job_id)
+
+    def close(self):
+        self.scheduler.close_job(self.job_id)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+class LLMScheduler:
+    """Dispatches prompts from many jobs onto a fixed pool of Gemini worker threads."""
+
+    def __init__(self, connector: GeminiConnector, workers: Optional[int] = None):
+        self.connector = connector
+        if workers is None:
+            limiter = getattr(connector, 'rate_limiter', None)
+            workers = limiter.max_concurrent if limiter else 4
+        self.workers = workers
+        self._jobs = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = []
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"llm-scheduler-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def register_job(self, job_id: str, weight: float = 1.0, deadline_seconds: Optional[float] = None) -> JobHandle:
+        """Create a queue for a job; weight scales its share of the workers."""
+        if weight <= 0:
+            raise ValueError("weight must be positive")
+        deadline = time.monotonic() + deadline_seconds if deadline_seconds else None
+        with self._cond:
+            if job_id in self._jobs:
+                raise ValueError(f"Job {job_id} is already registered")
+            # Start at the current virtual time so a new job neither starves nor is starved
+            self._jobs[job_id] = _Job(job_id, weight, deadline, self._virtual_time())
+        return JobHandle(self, job_id)
+
+    def _virtual_time(self) -> float:
+        busy = [job.pass_value for job in self._jobs.values() if job.queue]
+        return min(busy) if busy else max((job.pass_value for job in self._jobs.values()), default=0.0)
+
+    def submit(self, job_id: str, prompt: str, temperature: float = 0.7, priority: int = PRIORITY_FUNCTION) -> Future:
+        future = Future()
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or self._closed:
+                future.set_exception(RuntimeError(f"Job {job_id} is not registered"))
+                return future
+            if job.expired(time.monotonic()):
+                job.dropped += 1
+                future.set_exception(DeadlineExceeded(f"Job {job_id} passed its deadline"))
+                return future
+            if not job.queue:
+                # An idle job rejoins at the current virtual time instead of banking credit
+                job.pass_value = max(job.pass_value, self._virtual_time())
+            heapq.heappush(job.queue, (priority, next(self._seq), prompt, temperature, future))
+            self._cond.notify()
+        return future
+
+    def _drop_expired(self, job: _Job):
+        while job.queue:
+            future = heapq.heappop(job.queue)[-1]
+            job.dropped += 1
+            future.set_exception(DeadlineExceeded(f"Job {job.job_id} passed its deadline"))
+
+    def _next_request(self):
+        """Pop the next request under the fair-share policy; call with the lock held."""
+        now = time.monotonic()
+        best = None
+        for job in self._jobs.values():
+            if not job.queue:
+                continue
+            if job.expired(now):
+                self._drop_expired(job)
+                continue
+            # Ties go to the job closest to its deadline
+            key = (job.pass_value, job.deadline if job.deadline is not None else float('inf'))
+            if best is None or key < best[0]:
+                best = (key, job)
+        if best is None:
+            return None
+        job = best[1]
+        job.pass_value += 1.0 / job.weight
+        job.dispatched += 1
+        return heapq.heappop(job.queue)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                request = self._next_request()
+                while request is None:
+                    if self._closed:
+                        return
+                    self._cond.wait()
+                    request = self._next_request()
+            _, _, prompt, temperature, future = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(self.connector.generate_text(prompt, temperature))
+            except Exception as e:
+                future.set_exception(e)
+
+    def job_stats(self, job_id: str) -> dict:
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return {}
+            return {"queued": len(job.queue), "dispatched": job.dispatched, "dropped": job.dropped}
+
+    def close_job(self, job_id: str):
+        """Forget a job, cancelling anything it still has queued."""
+        with self._cond:
+            job = self._jobs.pop(job_id, None)
+        if job:
+            for entry in job.queue:
+                entry[-1].cancel()
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            job_ids = list(self._jobs)
+            self._cond.notify_all()
+        for job_id in job_ids:
+            self.close_job(job_id)
+        for thread in self._threads:
+            thread.join()
@@ -12,59 +12,98 @@ from dotenv import load_dotenv
 load_dotenv(os.path.join(os.path.dirname(__file__), '..', '.env'))
 
 from repo_parser import (
-    clone_repo, generate_file_tree, parse_code, build_graph,
-    analyze_code_with_ai, generate_markdown, save_docs
+    generate_file_tree, parse_code, build_graph, analyze_code_with_ai
 )
-from gemini_connector import GeminiConnector
-
-def orchestrate_documentation(repo_url: str) -> dict:
+from gemini_connector import GeminiConnector, RateLimiter
+from llm_scheduler import LLMScheduler
+from planner import plan_analysis, summarize_plan
+from renderers import render_docs
+from workspace import get_workspace_manager
+
+def _env_number(name: str, cast=float):
+    value = os.getenv(name)
+    return cast(value) if value else None
+
+def _output_formats() -> list:
+    """Backends to render, from OUTPUT_FORMATS; markdown is always included for the API response."""
+    formats = [f.strip() for f in os.getenv("OUTPUT_FORMATS", "markdown,site,json").split(",") if f.strip()]
+    return formats if "markdown" in formats else ["markdown"] + formats
+
+def orchestrate_documentation(repo_url: str, deadline_seconds: float = None,
+                              max_llm_calls: int = None, time_budget_seconds: float = None) -> dict:
     """Main orchestration function for documentation generation."""
+    workspace = None
+    scheduler = None
     try:
-        # Initialize Gemini connector
-        gemini_connector = GeminiConnector()
-
-        # Step 1: Clone repository
+        # Configuration errors (bad numbers, unwritable workspace) are reported as JSON errors too
+        workspace = get_workspace_manager()
+        if max_llm_calls is None:
+            max_llm_calls = _env_number("LLM_MAX_CALLS", int)
+        if time_budget_seconds is None:
+            time_budget_seconds = _env_number("LLM_TIME_BUDGET_SECONDS")
+        if deadline_seconds is None:
+            # The time budget doubles as a hard deadline so the SLA holds even if calls run slow
+            deadline_seconds = _env_number("LLM_JOB_DEADLINE_SECONDS") or time_budget_seconds
+
+        # Initialize Gemini connector and the scheduler that feeds it
+        gemini_connector = GeminiConnector(rate_limiter=RateLimiter())
+        scheduler = LLMScheduler(gemini_connector)
+
+        # Step 1: Clone repository (the checkout is removed or returned to the cache on exit)
         print("Cloning repository...", file=sys.stderr)
-        repo_path = clone_repo(repo_url)
+        with workspace.checkout(repo_url) as repo_path:
+            # Step 2: Generate file tree
+            print("Generating file tree...", file=sys.stderr)
+            file_tree = generate_file_tree(repo_path)
 
-        # Step 2: Generate file tree
-        print("Generating file tree...", file=sys.stderr)
-        file_tree = generate_file_tree(repo_path)
-
-        # Step 3: Parse code
-        print("Parsing code...", file=sys.stderr)
-        code_context = parse_code(repo_path)
+            # Step 3: Parse code
+            print("Parsing code...", file=sys.stderr)
+            code_context = parse_code(repo_path)
 
         # Step 4: Build graph
         print("Building code graph...", file=sys.stderr)
         code_graph = build_graph(code_context)
 
-        # Step 5: AI-enhanced analysis
+        # Step 5: Plan which files get AI analysis within the budget
+        plan = plan_analysis(code_context, code_graph, max_calls=max_llm_calls,
+                             max_seconds=time_budget_seconds,
+                             concurrency=scheduler.workers)
+
+        # Step 6: AI-enhanced analysis
         print("Analyzing code with AI...", file=sys.stderr)
-        enhanced_context = analyze_code_with_ai(code_context, gemini_connector)
+        with scheduler.register_job(repo_url, deadline_seconds=deadline_seconds) as job:
+            enhanced_context = analyze_code_with_ai(code_context, job, plan)
 
-        # Step 6: Generate documentation
+        # Step 7: Render and save documentation with every output backend
         print("Generating documentation...", file=sys.stderr)
-        docs = generate_markdown(code_graph, repo_url, enhanced_context)
-
-        # Step 7: Save documentation
-        print("Saving documentation...", file=sys.stderr)
-        output_file = save_docs(docs, repo_url)
+        rendered = render_docs(code_graph, repo_url, enhanced_context, file_tree,
+                               backends=_output_formats())
+        docs = rendered["markdown"]["docs"]
+        output_file = rendered["markdown"]["path"]
 
         return {
             "status": "success",
-            "repo_path": repo_path,
             "file_tree": file_tree,
             "code_graph": code_graph,
             "docs": docs,
-            "output_file": output_file
+            "output_file": output_file,
+            "outputs": {name: result["path"] for name, result in rendered.items()},
+            "analysis_plan": summarize_plan(plan),
+            "workspace": workspace.metrics()
         }
 
     except Exception as e:
-        return {
+        result = {
             "status": "error",
             "error": str(e)
         }
+        if workspace is not None:
+            result["workspace"] = workspace.metrics()
+        return result
+
+    finally:
+        if scheduler is not None:
+            scheduler.shutdown()
 
 def main():
     """Main entry point when called from command line."""
@@ -72,6 +111,11 @@ def main():
         print(json.dumps({"status": "error", "error": "Missing repo_url argument"}))
         sys.exit(1)
 
+    if sys.argv[1] == "--batch":
+        from batch_orchestrator import main as batch_main
+        batch_main(sys.argv[2:])
+        return
+
     repo_url = sys.argv[1]
     result = orchestrate_documentation(repo_url)
     print(json.dumps(result))
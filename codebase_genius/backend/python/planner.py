@@ -0,0 +1,180 @@
+"""
+Budget-driven planning of AI analysis.
+
+Files are ranked by how central they are to the codebase (import in-degree and
+PageRank over the import graph from build_graph), how many symbols they define
+and how large they are. Test files, generated code and trivial __init__ files
+are pushed to the bottom. Given a maximum number of Gemini calls or seconds,
+plan_analysis spends the budget on the top-ranked files; the rest get cheap
+template summaries instead of LLM calls.
+"""
+
+import math
+import os
+import re
+
+MAX_FUNCTION_PROMPTS = 5
+
+# Rough cost of one Gemini call, used to turn a time budget into a call budget
+DEFAULT_SECONDS_PER_CALL = float(os.getenv("LLM_SECONDS_PER_CALL", "3"))
+
+TEST_PATTERN = re.compile(r'(^|/)(tests?|__tests__|spec)/|(^|/)test_[^/]*$|_test\.\w+$|\.(test|spec)\.\w+$')
+GENERATED_PATTERN = re.compile(r'(^|/)(generated|gen|vendor|third_party|migrations)/|_pb2\.py$|\.min\.js$|\.g\.\w+$|\.generated\.\w+$')
+GENERATED_MARKERS = ('@generated', 'DO NOT EDIT', 'Code generated by', 'auto-generated', 'autogenerated')
+
+def _import_edges(code_graph: dict) -> list:
+    """Return (importer, imported) file pairs from a node-link code graph."""
+    edges = []
+    for link in code_graph.get('links', code_graph.get('edges', [])):
+        if link.get('relation') != 'imports':
+            continue
+        source, target = str(link['source']), str(link['target'])
+        if source.startswith('file:') and target.startswith('file:'):
+            edges.append((source[5:], target[5:]))
+    return edges
+
+def _pagerank(files: list, edges: list, damping: float = 0.85, iterations: int = 30) -> dict:
+    """Plain power-iteration PageRank over the file import graph."""
+    if not files:
+        return {}
+    n = len(files)
+    rank = {f: 1.0 / n for f in files}
+    outgoing = {f: [] for f in files}
+    for source, target in edges:
+        if source in outgoing and target in rank:
+            outgoing[source].append(target)
+    for _ in range(iterations):
+        dangling = sum(rank[f] for f in files if not outgoing[f])
+        new_rank = {f: (1 - damping) / n + damping * dangling / n for f in files}
+        for source, targets in outgoing.items():
+            if targets:
+                share = damping * rank[source] / len(targets)
+                for target in targets:
+                    new_rank[target] += share
+        rank = new_rank
+    return rank
+
+def classify_file(file_path: str, data: dict) -> str:
+    """Return 'test', 'generated', 'trivial' or 'source' for a parsed file."""
+    path = file_path.replace(os.sep, '/')
+    if TEST_PATTERN.search(path):
+        return 'test'
+    if GENERATED_PATTERN.search(path) or any(marker in data.get('code', '')[:500] for marker in GENERATED_MARKERS):
+        return 'generated'
+    size = len(data.get('full_code', data.get('code', '')))
+    symbols = len(data.get('functions', [])) + len(data.get('classes', []))
+    if symbols == 0 and (os.path.basename(path).startswith('__init__') or size < 200):
+        return 'trivial'
+    return 'source'
+
+CATEGORY_FACTORS = {'source': 1.0, 'test': 0.2, 'generated': 0.05, 'trivial': 0.05}
+
+def score_files(code_context: dict, code_graph: dict) -> list:
+    """Rank files by importance, most important first.
+
+    Returns a list of dicts with file, score, category and the raw signals.
+    """
+    files = list(code_context.keys())
+    edges = _import_edges(code_graph)
+    in_degree = {f: 0 for f in files}
+    for _, target in edges:
+        if target in in_degree:
+            in_degree[target] += 1
+    centrality = _pagerank(files, edges)
+
+    signals = {}
+    for file_path, data in code_context.items():
+        signals[file_path] = {
+            'in_degree': in_degree[file_path],
+            'centrality': centrality.get(file_path, 0.0),
+            'symbols': len(data.get('functions', [])) + len(data.get('classes', [])),
+            'size': len(data.get('full_code', data.get('code', ''))),
+        }
+
+    def normalized(key, transform=lambda v: v):
+        top = max((transform(s[key]) for s in signals.values()), default=0)
+        return {f: (transform(s[key]) / top if top else 0.0) for f, s in signals.items()}
+
+    in_degree_n = normalized('in_degree')
+    centrality_n = normalized('centrality')
+    symbols_n = normalized('symbols', math.log1p)
+    size_n = normalized('size', math.log1p)
+
+    ranked = []
+    for file_path in files:
+        category = classify_file(file_path, code_context[file_path])
+        score = (3 * in_degree_n[file_path] + 2 * centrality_n[file_path]
+                 + 2 * symbols_n[file_path] + size_n[file_path])
+        ranked.append({
+            'file': file_path,
+            'score': round(score * CATEGORY_FACTORS[category], 4),
+            'category': category,
+            **signals[file_path]
+        })
+    ranked.sort(key=lambda entry: (-entry['score'], entry['file']))
+    return ranked
+
+def summarize_plan(plan: dict) -> dict:
+    """Count planned files per mode and the Gemini calls the plan will make."""
+    summary = {'ai': 0, 'template': 0, 'llm_calls': 0}
+    for file_plan in plan.values():
+        summary[file_plan['mode']] += 1
+        if file_plan['mode'] == 'ai':
+            summary['llm_calls'] += 1 + file_plan['function_prompts']
+    return summary
+
+def plan_analysis(code_context: dict, code_graph: dict, max_calls: int = None,
+                  max_seconds: float = None, concurrency: int = 1,
+                  seconds_per_call: float = DEFAULT_SECONDS_PER_CALL) -> dict:
+    """Decide which files get AI analysis within the given budget.
+
+    Returns {file_path: {'mode': 'ai' | 'template', 'function_prompts': n,
+    'rank': i, 'score': s, 'category': c}}, in rank order. With no budget,
+    every file gets full AI analysis.
+    """
+    budget = None
+    if max_calls is not None:
+        budget = max_calls
+    if max_seconds is not None:
+        time_calls = int(max_seconds * max(concurrency, 1) / seconds_per_call)
+        budget = time_calls if budget is None else min(budget, time_calls)
+
+    plan = {}
+    for rank, entry in enumerate(score_files(code_context, code_graph)):
+        file_path = entry['file']
+        wanted = min(MAX_FUNCTION_PROMPTS, len(code_context[file_path].get('functions', [])))
+        if budget is None:
+            mode, function_prompts = 'ai', wanted
+        elif budget > 0 and entry['category'] in ('source', 'test'):
+            # Overview first; function prompts only with what is left
+            function_prompts = min(wanted, budget - 1)
+            budget -= 1 + function_prompts
+            mode = 'ai'
+        else:
+            mode, function_prompts = 'template', 0
+        plan[file_path] = {
+            'mode': mode,
+            'function_prompts': function_prompts,
+            'rank': rank,
+            'score': entry['score'],
+            'category': entry['category'],
+        }
+    return plan
+
+def template_summary(data: dict, lang_name: str, category: str = 'source') -> str:
+    """Cheap summary for files that did not get an AI analysis."""
+    reason = {
+        'test': 'test file',
+        'generated': 'generated code',
+        'trivial': 'trivial file',
+    }.get(category, 'not analyzed by AI to stay within the analysis budget')
+    parts = [f"{lang_name} file ({reason})"]
+    classes = data.get('classes', [])
+    functions = data.get('functions', [])
+    if classes:
+        parts.append(f"defines {len(classes)} class(es): " + ', '.join(f"`{c}`" for c in classes[:5]))
+    if functions:
+        parts.append(f"{len(functions)} function(s): " + ', '.join(f"`{f}`" for f in functions[:5]))
+    if data.get('imports'):
+        parts.append(f"{len(data['imports'])} import(s)")
+    return '; '.join(parts) + '.'
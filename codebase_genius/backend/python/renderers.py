@@ -0,0 +1,250 @@
+"""
+Render stage for Codebase Genius - turns one analysis into any number of outputs.
+
+Each output format is a backend registered in BACKENDS:
+
+    markdown  single docs.md (the original output)
+    site      sharded doc site: site/index.md plus one page per directory
+    json      analysis.json, the full analysis for other tools to consume
+
+Backends run side by side, and the site backend renders its changed pages in
+a process pool, since page rendering is pure Python and threads would share
+one GIL. The site keeps a hash of each page's inputs in .render_state.json and
+only rewrites pages whose inputs changed since the last render.
+"""
+
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+import networkx as nx
+
+from repo_parser import (
+    DEFAULT_OUTPUT_DIR, generate_markdown, save_docs, repo_output_key,
+    render_header, render_overview, render_file_section,
+    render_structure, render_usage, render_footer
+)
+
+# Keys left out of exported and hashed file data; full_code is large and already summarized
+EXCLUDED_KEYS = {'full_code'}
+
+def _file_data(data: dict) -> dict:
+    return {key: value for key, value in data.items() if key not in EXCLUDED_KEYS}
+
+def _digest(payload) -> str:
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def _write_text(path: str, text: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+def _render_page(directory: str, files: dict, graph_data: dict) -> str:
+    """Render one site page from picklable inputs, so pages can render in worker processes."""
+    md = f"# 📁 `{directory or '.'}`\n\n"
+    md += "[← Back to index](../index.md)\n\n"
+    md += "## 🔍 Files\n\n"
+    for file_path, data in files.items():
+        md += render_file_section(file_path, data)
+    md += render_structure(nx.node_link_graph(graph_data))
+    return md
+
+class OutputBackend:
+    """Base class for render backends."""
+
+    name = None
+
+    def render(self, analysis: dict, repo_dir: str, pool: Optional[Executor] = None) -> dict:
+        """Write this backend's output under repo_dir and return a result summary.
+
+        pool, when given, is a process pool for CPU-bound rendering; anything
+        submitted to it must be picklable.
+        """
+        raise NotImplementedError
+
+class MarkdownBackend(OutputBackend):
+    name = "markdown"
+
+    def render(self, analysis: dict, repo_dir: str, pool: Optional[Executor] = None) -> dict:
+        docs = generate_markdown(analysis['code_graph'], analysis['repo_url'], analysis['enhanced_context'])
+        output_file = save_docs(docs, analysis['repo_url'], os.path.dirname(repo_dir))
+        return {"path": output_file, "docs": docs}
+
+class SiteBackend(OutputBackend):
+    name = "site"
+    state_file = ".render_state.json"
+
+    @staticmethod
+    def page_name(directory: str) -> str:
+        """Page file for a directory; top-level files get the reserved root.md.
+
+        Other directories get a readable slug plus a digest of the full path, so
+        neither a directory called root nor paths that flatten to the same slug
+        can collide.
+        """
+        directory = directory.replace('\\', '/')
+        if not directory:
+            return 'root.md'
+        slug = re.sub(r'[^\w.-]+', '_', directory)
+        return f"{slug}-{hashlib.sha1(directory.encode('utf-8')).hexdigest()[:8]}.md"
+
+    def _pages(self, analysis: dict) -> dict:
+        """Group files by directory: {directory: [file_path, ...]}."""
+        pages = {}
+        for file_path in analysis['enhanced_context']:
+            pages.setdefault(os.path.dirname(file_path), []).append(file_path)
+        return dict(sorted(pages.items()))
+
+    def _render_index(self, analysis: dict, G: nx.DiGraph, pages: dict) -> str:
+        context = analysis['enhanced_context']
+        md = render_header(analysis['repo_url'])
+        md += render_overview(G, context)
+        md += "## 📁 Directories\n\n"
+        md += "| Directory | Files | Classes | Functions |\n"
+        md += "|---|---|---|---|\n"
+        for directory, files in pages.items():
+            classes = sum(len(context[f].get('classes', [])) for f in files)
+            functions = sum(len(context[f].get('functions', [])) for f in files)
+            md += f"| [`{directory or '.'}`](pages/{self.page_name(directory)}) | {len(files)} | {classes} | {functions} |\n"
+        md += "\n"
+        md += render_usage(analysis['repo_url'])
+        md += render_footer()
+        return md
+
+    @staticmethod
+    def _nodes_by_file(G: nx.DiGraph) -> dict:
+        """Index graph nodes by their file once, instead of scanning the graph per page."""
+        index = {}
+        for node, data in G.nodes(data=True):
+            if data.get('file') is not None:
+                index.setdefault(data['file'], []).append(node)
+        return index
+
+    def _page_inputs(self, directory: str, files: dict, analysis: dict, sub: nx.DiGraph) -> str:
+        return _digest({
+            "repo_url": analysis['repo_url'],
+            "directory": directory,
+            "files": files,
+            "nodes": sorted(sub.nodes),
+            "edges": sorted((u, v, d.get('relation', '')) for u, v, d in sub.edges(data=True)),
+        })
+
+    def _load_state(self, site_dir: str) -> dict:
+        try:
+            with open(os.path.join(site_dir, self.state_file), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def render(self, analysis: dict, repo_dir: str, pool: Optional[Executor] = None) -> dict:
+        site_dir = os.path.join(repo_dir, "site")
+        G = nx.node_link_graph(analysis['code_graph'])
+        pages = self._pages(analysis)
+        previous = self._load_state(site_dir)
+        state = {}
+        written = 0
+
+        # The index depends on every directory's counts, so hash the whole page list
+        index_path = os.path.join(site_dir, "index.md")
+        state["index.md"] = _digest({
+            "repo_url": analysis['repo_url'],
+            "pages": {d: [_file_data(analysis['enhanced_context'][f]) for f in files] for d, files in pages.items()},
+            "nodes": G.number_of_nodes(),
+            "edges": G.number_of_edges(),
+        })
+        if previous.get("index.md") != state["index.md"] or not os.path.exists(index_path):
+            _write_text(index_path, self._render_index(analysis, G, pages))
+            written += 1
+
+        nodes_by_file = self._nodes_by_file(G)
+        jobs = {}
+        for directory, files in pages.items():
+            name = f"pages/{self.page_name(directory)}"
+            page_path = os.path.join(site_dir, name)
+            sub = G.subgraph([node for f in files for node in nodes_by_file.get(f, [])])
+            file_data = {f: _file_data(analysis['enhanced_context'][f]) for f in files}
+            state[name] = self._page_inputs(directory, file_data, analysis, sub)
+            if previous.get(name) != state[name] or not os.path.exists(page_path):
+                jobs[page_path] = (directory, file_data, nx.node_link_data(sub))
+
+        # A single changed page is not worth a trip to a worker process
+        if pool is not None and len(jobs) > 1:
+            futures = {page_path: pool.submit(_render_page, *args) for page_path, args in jobs.items()}
+            rendered = ((page_path, future.result()) for page_path, future in futures.items())
+        else:
+            rendered = ((page_path, _render_page(*args)) for page_path, args in jobs.items())
+        for page_path, text in rendered:
+            _write_text(page_path, text)
+        written += len(jobs)
+
+        # Drop pages for directories that no longer exist
+        removed = 0
+        for name in previous:
+            if name not in state:
+                stale_path = os.path.join(site_dir, name)
+                if os.path.exists(stale_path):
+                    os.remove(stale_path)
+                    removed += 1
+
+        _write_text(os.path.join(site_dir, self.state_file), json.dumps(state, indent=2, sort_keys=True))
+        return {
+            "path": index_path,
+            "pages": len(state),
+            "pages_written": written,
+            "pages_unchanged": len(state) - written,
+            "pages_removed": removed
+        }
+
+class JsonBackend(OutputBackend):
+    name = "json"
+
+    def render(self, analysis: dict, repo_dir: str, pool: Optional[Executor] = None) -> dict:
+        output_file = os.path.join(repo_dir, "analysis.json")
+        export = {
+            "repo_url": analysis['repo_url'],
+            "file_tree": analysis.get('file_tree'),
+            "code_graph": analysis['code_graph'],
+            "files": {f: _file_data(data) for f, data in analysis['enhanced_context'].items()},
+        }
+        _write_text(output_file, json.dumps(export, indent=2, default=str))
+        return {"path": output_file}
+
+BACKENDS = {}
+
+def register_backend(backend_cls) -> None:
+    """Make an OutputBackend subclass available to render_docs by its name."""
+    BACKENDS[backend_cls.name] = backend_cls
+
+for _backend in (MarkdownBackend, SiteBackend, JsonBackend):
+    register_backend(_backend)
+
+def render_docs(code_graph: dict, repo_url: str, enhanced_context: dict, file_tree: dict = None,
+                output_dir: str = None, backends: list = None, workers: int = None) -> dict:
+    """Render the analysis with each backend and return {backend: result}.
+
+    workers sizes the process pool used for site pages (default: CPU count).
+    """
+    backends = backends or list(BACKENDS)
+    unknown = [name for name in backends if name not in BACKENDS]
+    if unknown:
+        raise ValueError(f"Unknown output backend(s): {', '.join(unknown)}")
+
+    repo_dir = os.path.join(output_dir or DEFAULT_OUTPUT_DIR, repo_output_key(repo_url))
+    analysis = {
+        "repo_url": repo_url,
+        "code_graph": code_graph,
+        "enhanced_context": enhanced_context or {},
+        "file_tree": file_tree,
+    }
+
+    # Worker processes start on first use, so a render with nothing to rebuild spawns none
+    with ProcessPoolExecutor(max_workers=workers) as pool, \
+            ThreadPoolExecutor(max_workers=len(backends)) as backend_pool:
+        futures = {name: backend_pool.submit(BACKENDS[name]().render, analysis, repo_dir, pool) for name in backends}
+        return {name: future.result() for name, future in futures.items()}
@@ -1,17 +1,37 @@
 import os
+import hashlib
 import tempfile
 import git
 from git import Repo
 import re
 import networkx as nx
 from pathlib import Path
+from concurrent.futures import Future
 from gemini_connector import GeminiConnector
-
-def clone_repo(repo_url: str) -> str:
-    """Clone the repository to a temporary directory and return the path."""
-    temp_dir = tempfile.mkdtemp()
-    Repo.clone_from(repo_url, temp_dir)
-    return temp_dir
+from llm_scheduler import PRIORITY_FILE, PRIORITY_FUNCTION, DeadlineExceeded
+from planner import MAX_FUNCTION_PROMPTS, template_summary
+
+def normalize_repo_url(repo_url: str) -> str:
+    """Strip whitespace, trailing slashes and a .git suffix so equivalent URLs compare equal."""
+    url = repo_url.strip().rstrip('/')
+    if url.endswith('.git'):
+        url = url[:-4]
+    return url
+
+def repo_name(repo_url: str) -> str:
+    """Return the repository name, the last segment of its normalized URL."""
+    return normalize_repo_url(repo_url).split('/')[-1] or "repo"
+
+def repo_output_key(repo_url: str) -> str:
+    """Return a directory name unique to the repository: its name plus a digest of the URL."""
+    digest = hashlib.sha1(normalize_repo_url(repo_url).encode('utf-8')).hexdigest()[:8]
+    return f"{repo_name(repo_url)}-{digest}"
+
+def clone_repo(repo_url: str, dest: str = None) -> str:
+    """Clone the repository into dest (a new temporary directory by default) and return the path."""
+    target_dir = dest or tempfile.mkdtemp()
+    Repo.clone_from(repo_url, target_dir)
+    return target_dir
 
 def generate_file_tree(repo_path: str) -> dict:
     """Generate a file tree excluding irrelevant folders."""
@@ -162,11 +182,46 @@ def build_graph(code_context: dict) -> dict:
 
     return nx.node_link_data(G)
 
-def analyze_code_with_ai(code_context: dict, gemini_connector: GeminiConnector) -> dict:
-    """Use Gemini AI to analyze code and extract insights."""
-    enhanced_context = {}
+def _prompt_submitter(gemini_connector):
+    """Return submit(prompt, temperature, priority) -> Future for a connector or scheduler job."""
+    if hasattr(gemini_connector, 'submit'):
+        return gemini_connector.submit
 
-    for file_path, data in code_context.items():
+    def submit(prompt: str, temperature: float, priority: int) -> Future:
+        # Plain connector: run the prompt right away on the calling thread
+        future = Future()
+        try:
+            future.set_result(gemini_connector.generate_text(prompt, temperature=temperature))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    return submit
+
+def analyze_code_with_ai(code_context: dict, gemini_connector: GeminiConnector, plan: dict = None) -> dict:
+    """Use Gemini AI to analyze code and extract insights.
+
+    gemini_connector may also be an llm_scheduler.JobHandle, in which case all
+    prompts are queued up front so file overviews run before function prompts.
+    plan (from planner.plan_analysis) limits AI analysis to the files it marks
+    'ai', submitted in rank order; the others get template summaries.
+    """
+    submitted = submit_code_analysis(code_context, gemini_connector, plan)
+    return collect_code_analysis(code_context, submitted)
+
+def submit_code_analysis(code_context: dict, gemini_connector: GeminiConnector, plan: dict = None) -> tuple:
+    """Queue every analysis prompt without waiting for results.
+
+    Returns (pending, templates) for collect_code_analysis: pending maps each
+    AI-analyzed file to (analysis_future, {function: future}, lang_name, category).
+    """
+    submit = _prompt_submitter(gemini_connector)
+    pending = {}
+    templates = {}
+
+    file_order = list(plan.keys()) if plan else list(code_context.keys())
+    for file_path in file_order:
+        data = code_context[file_path]
         language = data.get('language', 'Unknown')
         lang_name = {
             'PY': 'Python',
@@ -187,6 +242,12 @@ def analyze_code_with_ai(code_context: dict, gemini_connector: GeminiConnector)
             'SCALA': 'Scala'
         }.get(language, language)
 
+        file_plan = plan.get(file_path) if plan else None
+        if file_plan and file_plan['mode'] != 'ai':
+            templates[file_path] = template_summary(data, lang_name, file_plan['category'])
+            continue
+        function_limit = file_plan['function_prompts'] if file_plan else MAX_FUNCTION_PROMPTS
+
         # Analyze the code with AI
         analysis_prompt = f"""
         Analyze this {lang_name} code file and provide insights:
@@ -206,14 +267,11 @@ def analyze_code_with_ai(code_context: dict, gemini_connector: GeminiConnector)
         Keep the analysis concise but informative.
         """
 
-        try:
-            analysis = gemini_connector.generate_text(analysis_prompt, temperature=0.3)
-        except Exception as e:
-            analysis = f"AI analysis failed: {str(e)}"
+        analysis_future = submit(analysis_prompt, 0.3, PRIORITY_FILE)
 
         # Analyze individual functions and classes
-        function_analyses = {}
-        for func in data['functions'][:5]:  # Limit to first 5 functions
+        function_futures = {}
+        for func in data['functions'][:function_limit]:  # Limit to first few functions
             func_prompt = f"""
             Analyze this {lang_name} function/method:
 
@@ -222,70 +280,109 @@ def analyze_code_with_ai(code_context: dict, gemini_connector: GeminiConnector)
             Based on the function name and typical usage patterns in {lang_name}, what does this function likely do?
             Provide a brief description.
             """
+            function_futures[func] = submit(func_prompt, 0.2, PRIORITY_FUNCTION)
+
+        category = file_plan['category'] if file_plan else 'source'
+        pending[file_path] = (analysis_future, function_futures, lang_name, category)
+
+    return pending, templates
+
+def submitted_futures(submitted: tuple) -> list:
+    """Return every prompt future queued by submit_code_analysis."""
+    pending, _ = submitted
+    futures = []
+    for analysis_future, function_futures, _, _ in pending.values():
+        futures.append(analysis_future)
+        futures.extend(function_futures.values())
+    return futures
+
+def collect_code_analysis(code_context: dict, submitted: tuple) -> dict:
+    """Wait for the prompts queued by submit_code_analysis and build the enhanced context."""
+    pending, templates = submitted
+    enhanced_context = {}
+    for file_path in code_context:
+        if file_path in templates:
+            enhanced_context[file_path] = {
+                **code_context[file_path],
+                'ai_analysis': templates[file_path],
+                'function_descriptions': {}
+            }
+            continue
+
+        analysis_future, function_futures, lang_name, category = pending[file_path]
+        try:
+            analysis = analysis_future.result()
+        except DeadlineExceeded:
+            # Dropped at the job deadline: fall back to the same summary as unplanned files
+            analysis = template_summary(code_context[file_path], lang_name, category)
+        except Exception as e:
+            analysis = f"AI analysis failed: {str(e)}"
+
+        function_analyses = {}
+        for func, func_future in function_futures.items():
             try:
-                func_analysis = gemini_connector.generate_text(func_prompt, temperature=0.2)
-                function_analyses[func] = func_analysis.strip()
+                function_analyses[func] = func_future.result().strip()
             except:
                 function_analyses[func] = f"Function {func} - purpose analysis unavailable"
 
         enhanced_context[file_path] = {
-            **data,
+            **code_context[file_path],
             'ai_analysis': analysis,
             'function_descriptions': function_analyses
         }
 
     return enhanced_context
 
-def generate_markdown(code_graph: dict, repo_url: str, enhanced_context: dict = None) -> str:
-    """Generate comprehensive markdown documentation with AI insights."""
-    G = nx.node_link_graph(code_graph)
-    repo_name = repo_url.split('/')[-1]
-
-    md = f"# 📚 {repo_name} - Codebase Documentation\n\n"
+def render_header(repo_url: str) -> str:
+    """Render the documentation title block."""
+    md = f"# 📚 {repo_name(repo_url)} - Codebase Documentation\n\n"
     md += f"**Repository:** {repo_url}\n\n"
     md += f"**Analysis Date:** Generated by Codebase Genius AI\n\n"
+    return md
 
-    # Overview section
-    total_files = len([node for node, data in G.nodes(data=True) if data.get('type') == 'file'])
+def render_overview(G: nx.DiGraph, enhanced_context: dict = None) -> str:
+    """Render the overview statistics section."""
     total_classes = len([node for node, data in G.nodes(data=True) if data.get('type') == 'class'])
     total_functions = len([node for node, data in G.nodes(data=True) if data.get('type') == 'function'])
 
-    md += "## 📊 Overview\n\n"
+    md = "## 📊 Overview\n\n"
     md += f"- **Files Analyzed:** {len(enhanced_context) if enhanced_context else len(G.nodes)}\n"
     md += f"- **Classes:** {total_classes}\n"
     md += f"- **Functions:** {total_functions}\n"
     md += f"- **Code Relationships:** {len(G.edges)}\n\n"
+    return md
 
-    # File-by-file analysis
-    if enhanced_context:
-        md += "## 📁 File Analysis\n\n"
-        for file_path, data in enhanced_context.items():
-            md += f"### 🔍 `{file_path}`\n\n"
-            md += f"**AI Analysis:** {data.get('ai_analysis', 'Analysis not available')}\n\n"
-
-            if data.get('classes'):
-                md += "**Classes:**\n"
-                for cls in data['classes']:
-                    md += f"- `{cls}`\n"
-                md += "\n"
-
-            if data.get('functions'):
-                md += "**Functions:**\n"
-                for func in data['functions']:
-                    desc = data.get('function_descriptions', {}).get(func, f"Function {func}")
-                    md += f"- `{func}`: {desc}\n"
-                md += "\n"
-
-            if data.get('imports'):
-                md += "**Dependencies:**\n"
-                for imp in data['imports'][:10]:  # Limit to first 10 imports
-                    md += f"- `{imp}`\n"
-                if len(data['imports']) > 10:
-                    md += f"- ... and {len(data['imports']) - 10} more imports\n"
-                md += "\n"
-
-    # Code Structure Visualization
-    md += "## 🏗️ Code Structure\n\n"
+def render_file_section(file_path: str, data: dict) -> str:
+    """Render the analysis section for a single file."""
+    md = f"### 🔍 `{file_path}`\n\n"
+    md += f"**AI Analysis:** {data.get('ai_analysis', 'Analysis not available')}\n\n"
+
+    if data.get('classes'):
+        md += "**Classes:**\n"
+        for cls in data['classes']:
+            md += f"- `{cls}`\n"
+        md += "\n"
+
+    if data.get('functions'):
+        md += "**Functions:**\n"
+        for func in data['functions']:
+            desc = data.get('function_descriptions', {}).get(func, f"Function {func}")
+            md += f"- `{func}`: {desc}\n"
+        md += "\n"
+
+    if data.get('imports'):
+        md += "**Dependencies:**\n"
+        for imp in data['imports'][:10]:  # Limit to first 10 imports
+            md += f"- `{imp}`\n"
+        if len(data['imports']) > 10:
+            md += f"- ... and {len(data['imports']) - 10} more imports\n"
+        md += "\n"
+
+    return md
+
+def render_structure(G: nx.DiGraph) -> str:
+    """Render the code structure as a mermaid diagram."""
+    md = "## 🏗️ Code Structure\n\n"
     md += "```mermaid\ngraph TD\n"
 
     # Add nodes
@@ -303,9 +400,11 @@ def generate_markdown(code_graph: dict, repo_url: str, enhanced_context: dict =
         md += f"    {source} -->|{relation}| {target}\n"
 
     md += "```\n\n"
+    return md
 
-    # Installation and Usage
-    md += "## 🚀 Installation & Usage\n\n"
+def render_usage(repo_url: str) -> str:
+    """Render the installation and usage section."""
+    md = "## 🚀 Installation & Usage\n\n"
     md += "```bash\n"
     md += f"# Clone the repository\n"
     md += f"git clone {repo_url}\n\n"
@@ -314,17 +413,41 @@ def generate_markdown(code_graph: dict, repo_url: str, enhanced_context: dict =
     md += f"# Run the application\n"
     md += f"python main.py\n"
     md += "```\n\n"
+    return md
 
-    md += "## 🤖 Generated by Codebase Genius\n\n"
+def render_footer() -> str:
+    md = "## 🤖 Generated by Codebase Genius\n\n"
     md += "*This documentation was automatically generated using AI-powered code analysis.*\n"
+    return md
+
+def generate_markdown(code_graph: dict, repo_url: str, enhanced_context: dict = None) -> str:
+    """Generate comprehensive markdown documentation with AI insights."""
+    G = nx.node_link_graph(code_graph)
+
+    md = render_header(repo_url)
+    md += render_overview(G, enhanced_context)
+
+    # File-by-file analysis
+    if enhanced_context:
+        md += "## 📁 File Analysis\n\n"
+        for file_path, data in enhanced_context.items():
+            md += render_file_section(file_path, data)
+
+    md += render_structure(G)
+    md += render_usage(repo_url)
+    md += render_footer()
 
     return md
 
-def save_docs(docs: str, repo_url: str, output_dir: str = "../outputs") -> str:
+# Default location for generated docs: codebase_genius/backend/outputs
+DEFAULT_OUTPUT_DIR = os.getenv("OUTPUT_DIR") or os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'outputs')
+
+def save_docs(docs: str, repo_url: str, output_dir: str = None) -> str:
     """Save documentation to file and return the file path."""
-    repo_name = repo_url.split('/')[-1]
-    os.makedirs(f"{output_dir}/{repo_name}", exist_ok=True)
-    output_file = f"{output_dir}/{repo_name}/docs.md"
+    output_dir = output_dir or DEFAULT_OUTPUT_DIR
+    repo_dir = os.path.join(output_dir, repo_output_key(repo_url))
+    os.makedirs(repo_dir, exist_ok=True)
+    output_file = os.path.join(repo_dir, "docs.md")
 
     with open(output_file, 'w', encoding='utf-8') as f:
         f.write(docs)
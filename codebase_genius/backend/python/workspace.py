@@ -0,0 +1,415 @@
+"""
+Workspace management for cloned repositories.
+
+Every clone lives under a single workspace root. Checkouts are removed as soon
+as a job finishes (successfully or not) unless reuse is enabled, in which case
+they are kept for warm repeat jobs and evicted least-recently-used first once
+the workspace exceeds its disk quota.
+
+The quota is enforced per process: each WorkspaceManager only counts the
+checkouts it tracks, and a process with a single job always admits its one
+clone. Reused checkouts are shared by every process on the same root, so each
+one has a lease file next to it. A process holds a shared lease while a
+checkout is pinned, and refreshing, re-cloning or deleting a checkout needs
+the exclusive lease, so no process can remove a checkout another one is still
+reading. Leases use fcntl and are per process only where it is unavailable.
+"""
+
+import hashlib
+import os
+import shutil
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional
+
+from git import Repo
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from repo_parser import clone_repo, normalize_repo_url, repo_name
+
+def _dir_size(path: str) -> int:
+    """Return the total size in bytes of all files below path."""
+    total = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                continue
+    return total
+
+def _force_remove(func, path, exc_info):
+    # Git marks pack files read-only, which blocks deletion on Windows
+    os.chmod(path, stat.S_IWRITE)
+    func(path)
+
+def remove_tree(path: str) -> None:
+    """Delete a checkout, ignoring paths that are already gone."""
+    if os.path.exists(path):
+        shutil.rmtree(path, onerror=_force_remove)
+
+def _flock(fd: int, exclusive: bool, blocking: bool = True) -> bool:
+    """Lock a lease file; return False if a non-blocking lock is held elsewhere."""
+    if fcntl is None:
+        return True
+    mode = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+    try:
+        fcntl.flock(fd, mode if blocking else mode | fcntl.LOCK_NB)
+        return True
+    except BlockingIOError:
+        return False
+
+class WorkspaceManager:
+    """Owns every cloned repository on disk and keeps usage under a quota."""
+
+    def __init__(self, root: Optional[str] = None, quota_bytes: Optional[int] = None, reuse: Optional[bool] = None,
+                 stale_seconds: int = 6 * 3600, quota_wait_seconds: Optional[float] = None):
+        self.root = root or os.getenv("WORKSPACE_ROOT") or os.path.join(tempfile.gettempdir(), "codebase_genius_workspaces")
+        if quota_bytes is None:
+            quota_bytes = int(os.getenv("WORKSPACE_QUOTA_MB", "2048")) * 1024 * 1024
+        self.quota_bytes = quota_bytes
+        if reuse is None:
+            reuse = os.getenv("WORKSPACE_REUSE", "").lower() in ("1", "true", "yes")
+        self.reuse = reuse
+        self.stale_seconds = stale_seconds
+        if quota_wait_seconds is None:
+            quota_wait_seconds = float(os.getenv("WORKSPACE_QUOTA_WAIT_SECONDS", "600"))
+        self.quota_wait_seconds = quota_wait_seconds
+
+        os.makedirs(self.root, exist_ok=True)
+        self._lock = threading.Lock()
+        # Signalled whenever disk space is freed or a checkout becomes evictable
+        self._space = threading.Condition(self._lock)
+        # path -> size in bytes, ordered least to most recently used
+        self._checkouts = OrderedDict()
+        self._active = {}
+        self._path_locks = {}
+        # path -> lease file descriptor, held while the checkout is pinned in this process
+        self._leases = {}
+        self._cloning = 0
+        self._average_size = 0
+        self._stats = {"clones": 0, "reuses": 0, "cleanups": 0, "evictions": 0, "bytes_evicted": 0,
+                       "evictions_skipped": 0, "quota_waits": 0, "quota_rejections": 0}
+        self._adopt_existing()
+
+    def _adopt_existing(self):
+        """Track reusable checkouts from a previous process and remove stale job checkouts."""
+        entries = []
+        now = time.time()
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            if not os.path.isdir(path):
+                continue
+            mtime = os.path.getmtime(path)
+            if name.startswith("repo-") and self.reuse:
+                entries.append((mtime, path))
+            elif name.startswith("job-") and now - mtime > self.stale_seconds:
+                # Left behind by a crashed process; live jobs of other processes are recent
+                remove_tree(path)
+        for _, path in sorted(entries):
+            self._checkouts[path] = _dir_size(path)
+
+    def _cached_path(self, repo_url: str) -> str:
+        digest = hashlib.sha1(normalize_repo_url(repo_url).encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.root, f"repo-{digest}-{repo_name(repo_url)}")
+
+    def acquire(self, repo_url: str) -> str:
+        """Return a checkout of repo_url, cloning or refreshing it as needed.
+
+        The checkout is pinned until release() is called and is never evicted
+        while pinned, by this or any other process. A new clone waits until it
+        fits under the quota (see _admit_clone) and raises RuntimeError if it
+        does not within quota_wait_seconds.
+        """
+        if self.reuse:
+            path = self._cached_path(repo_url)
+            with self._lock:
+                self._active[path] = self._active.get(path, 0) + 1
+                path_lock = self._path_locks.setdefault(path, threading.Lock())
+            try:
+                with path_lock:
+                    with self._lock:
+                        pinned = path in self._leases
+                    if pinned:
+                        # Another job in this process is reading it, so share it as it is
+                        self._track(path, reused=True)
+                    else:
+                        fd = self._pin_checkout(repo_url, path)
+                        with self._lock:
+                            self._leases[path] = fd
+            except Exception:
+                self.release(path, success=False)
+                raise
+        else:
+            path = tempfile.mkdtemp(prefix="job-", dir=self.root)
+            with self._lock:
+                self._active[path] = 1
+            try:
+                self._clone(repo_url, path)
+            except Exception:
+                self._discard(path)
+                raise
+
+        self._enforce_quota()
+        return path
+
+    def _lease_path(self, path: str) -> str:
+        # Lease files are never deleted: unlinking one while another process
+        # opens it would let two processes lock different files for one checkout
+        return f"{path}.lease"
+
+    def _pin_checkout(self, repo_url: str, path: str) -> int:
+        """Bring a reusable checkout up to date and return its shared lease.
+
+        Refreshing or re-cloning needs the exclusive lease, so it only happens
+        when no other process has the checkout pinned; otherwise the checkout
+        is shared as it is.
+        """
+        deadline = time.monotonic() + self.quota_wait_seconds
+        while True:
+            fd = os.open(self._lease_path(path), os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                reused = True
+                if _flock(fd, exclusive=True, blocking=False):
+                    if not (self._is_checkout(path) and self._refresh(path)):
+                        remove_tree(path)
+                        os.makedirs(path)
+                        self._clone(repo_url, path)
+                        reused = False
+                # Waits out another process's clone; the downgrade from exclusive is
+                # not atomic, so check the checkout survived before using it
+                _flock(fd, exclusive=False)
+                if self._is_checkout(path):
+                    if reused:
+                        self._track(path, reused=True)
+                    return fd
+            except Exception:
+                os.close(fd)
+                raise
+            os.close(fd)
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"Checkout {path} kept disappearing while another process used it")
+            time.sleep(0.1)
+
+    @staticmethod
+    def _is_checkout(path: str) -> bool:
+        return os.path.isdir(os.path.join(path, ".git"))
+
+    def _track(self, path: str, reused: bool = False) -> None:
+        """Record a checkout's size, e.g. one another process cloned, and mark it recently used."""
+        with self._lock:
+            known = path in self._checkouts
+        size = None if known else _dir_size(path)
+        with self._lock:
+            if size is not None:
+                self._checkouts[path] = size
+            if path in self._checkouts:
+                self._checkouts.move_to_end(path)
+            if reused:
+                self._stats["reuses"] += 1
+
+    def _clone(self, repo_url: str, path: str) -> None:
+        """Clone into path once there is room for it, then record its size."""
+        self._admit_clone(path)
+        try:
+            clone_repo(repo_url, path)
+            size = _dir_size(path)
+        finally:
+            with self._space:
+                self._cloning -= 1
+                self._space.notify_all()
+        with self._lock:
+            self._checkouts[path] = size
+            self._checkouts.move_to_end(path)
+            self._stats["clones"] += 1
+            done = self._stats["clones"]
+            self._average_size += (size - self._average_size) / done
+
+    def _admit_clone(self, path: str) -> None:
+        """Block until usage plus the expected size of in-flight clones fits the quota.
+
+        Idle checkouts are evicted first. The size of a clone is not known in
+        advance, so each in-flight clone is assumed to be as large as the
+        average clone so far. A clone is always admitted when nothing else
+        holds workspace space, so a single oversized repository cannot wait
+        forever.
+        """
+        deadline = time.monotonic() + self.quota_wait_seconds
+        victims = []
+        try:
+            with self._space:
+                while True:
+                    reserved = (self._cloning + 1) * self._average_size
+                    victims += self._evict_idle_locked(self.quota_bytes - reserved)
+                    used = sum(self._checkouts.values()) + reserved
+                    others_active = any(other != path for other in self._active)
+                    if used <= self.quota_bytes or not (others_active or self._cloning):
+                        self._cloning += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["quota_rejections"] += 1
+                        raise RuntimeError(
+                            f"Workspace quota of {self.quota_bytes / (1024 * 1024):g} MB is full; "
+                            f"gave up after waiting {self.quota_wait_seconds:.0f}s"
+                        )
+                    self._stats["quota_waits"] += 1
+                    self._space.wait(remaining)
+        finally:
+            # Evicted checkouts are no longer tracked, so they must leave the disk even on rejection
+            self._remove_victims(victims)
+
+    def _refresh(self, path: str) -> bool:
+        """Fast-forward a cached checkout; return False if it must be re-cloned."""
+        try:
+            Repo(path).remotes.origin.pull()
+            os.utime(path)
+            return True
+        except Exception:
+            return False
+
+    def release(self, path: str, success: bool = True) -> None:
+        """Unpin a checkout, deleting it unless it is kept for reuse."""
+        with self._lock:
+            remaining = self._active.get(path, 1) - 1
+            if remaining > 0:
+                self._active[path] = remaining
+                return
+            self._active.pop(path, None)
+            lease = self._leases.pop(path, None)
+            keep = self.reuse and success
+            self._space.notify_all()
+        if keep:
+            if lease is not None:
+                os.close(lease)
+            self._enforce_quota()
+        else:
+            self._discard(path, lease)
+
+    def _discard(self, path: str, lease: Optional[int] = None) -> None:
+        with self._lock:
+            self._active.pop(path, None)
+            self._checkouts.pop(path, None)
+            self._stats["cleanups"] += 1
+        self._remove_checkout(path, lease)
+        with self._space:
+            self._space.notify_all()
+
+    def _remove_checkout(self, path: str, lease: Optional[int] = None) -> bool:
+        """Delete a checkout unless another process has it pinned; return whether it was deleted.
+
+        lease is this process's open lease on the checkout, if it holds one;
+        it is closed either way.
+        """
+        if not self.reuse:
+            # Job checkouts are private to this process
+            remove_tree(path)
+            return True
+        if lease is None:
+            lease = os.open(self._lease_path(path), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if not _flock(lease, exclusive=True, blocking=False):
+                return False
+            remove_tree(path)
+            return True
+        finally:
+            os.close(lease)
+
+    def _evict_idle_locked(self, target_bytes: int) -> list:
+        """Drop least-recently-used idle checkouts until usage fits target_bytes.
+
+        Call with the lock held; returns (path, size) pairs to pass to
+        _remove_victims after releasing it.
+        """
+        victims = []
+        used = sum(self._checkouts.values())
+        for path, size in list(self._checkouts.items()):
+            if used <= target_bytes:
+                break
+            if path in self._active:
+                continue
+            del self._checkouts[path]
+            used -= size
+            victims.append((path, size))
+        return victims
+
+    def _remove_victims(self, victims: list) -> None:
+        """Delete evicted checkouts, skipping any another process has pinned.
+
+        A skipped checkout stays on disk under that process's quota and is
+        tracked again here the next time this process acquires it.
+        """
+        for path, size in victims:
+            if self._remove_checkout(path):
+                with self._lock:
+                    self._stats["evictions"] += 1
+                    self._stats["bytes_evicted"] += size
+            else:
+                with self._lock:
+                    self._stats["evictions_skipped"] += 1
+
+    def _enforce_quota(self) -> None:
+        """Evict least-recently-used idle checkouts until usage fits the quota."""
+        with self._lock:
+            victims = self._evict_idle_locked(self.quota_bytes)
+        self._remove_victims(victims)
+        if victims:
+            with self._space:
+                self._space.notify_all()
+
+    @contextmanager
+    def checkout(self, repo_url: str):
+        """Context manager yielding a checkout path that is always cleaned up."""
+        path = self.acquire(repo_url)
+        success = False
+        try:
+            yield path
+            success = True
+        finally:
+            self.release(path, success)
+
+    def cleanup(self) -> None:
+        """Remove every idle checkout."""
+        with self._lock:
+            idle = [path for path in self._checkouts if path not in self._active]
+        for path in idle:
+            self._discard(path)
+
+    def metrics(self) -> dict:
+        """Return disk usage and lifecycle counters for monitoring."""
+        with self._lock:
+            used = sum(self._checkouts.values())
+            metrics = {
+                "root": self.root,
+                "reuse": self.reuse,
+                "quota_bytes": self.quota_bytes,
+                "used_bytes": used,
+                "checkouts": len(self._checkouts),
+                "active": len(self._active),
+                "cloning": self._cloning,
+                **self._stats
+            }
+        try:
+            metrics["disk_free_bytes"] = shutil.disk_usage(self.root).free
+        except OSError:
+            pass
+        metrics["timestamp"] = time.time()
+        return metrics
+
+# Shared instance for the single-repository orchestrator and Jac integration
+workspace_manager = None
+
+def get_workspace_manager() -> WorkspaceManager:
+    """Return the process-wide workspace manager, creating it on first use."""
+    global workspace_manager
+    if workspace_manager is None:
+        workspace_manager = WorkspaceManager()
+    return workspace_manager
@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+pytest.importorskip("networkx")
+pytest.importorskip("git")
+pytest.importorskip("google.generativeai")
+
+import batch_orchestrator
+import workspace
+from workspace import WorkspaceManager
+
+class FakeConnector:
+    """Stands in for GeminiConnector and records every prompt it is sent."""
+
+    prompts = []
+    lock = threading.Lock()
+
+    def __init__(self, api_key=None, rate_limiter=None):
+        self.rate_limiter = rate_limiter
+
+    def generate_text(self, prompt, temperature=0.7):
+        with self.lock:
+            self.prompts.append(prompt)
+        return "Generated analysis."
+
+@pytest.fixture
+def batch(tmp_path, monkeypatch):
+    """Stub Gemini and git; a clone copies a small Python project unless the URL says broken."""
+    source = tmp_path / "source"
+    (source / "pkg").mkdir(parents=True)
+    (source / "pkg" / "core.py").write_text("import os\n\nclass Engine:\n    def run(self):\n        return os.getcwd()\n")
+    (source / "main.py").write_text("from pkg import core\n\ndef main():\n    core.Engine().run()\n")
+    clones = []
+
+    def fake_clone(repo_url, dest=None):
+        clones.append(repo_url)
+        if "broken" in repo_url:
+            raise RuntimeError("repository not found")
+        shutil.copytree(source, dest, dirs_exist_ok=True)
+        os.makedirs(os.path.join(dest, ".git"), exist_ok=True)
+        return dest
+
+    FakeConnector.prompts = []
+    monkeypatch.setattr(workspace, "clone_repo", fake_clone)
+    monkeypatch.setattr(batch_orchestrator, "GeminiConnector", FakeConnector)
+
+    urls_file = tmp_path / "repos.txt"
+    urls_file.write_text(
+        "# batch under test\n"
+        "https://github.com/example/alpha\n"
+        "https://github.com/other/alpha\n"
+        "https://github.com/example/alpha.git\n"
+        "https://github.com/example/broken\n"
+    )
+
+    def run():
+        return batch_orchestrator.orchestrate_batch(
+            str(urls_file), str(tmp_path / "manifest.json"),
+            clone_workers=2, parse_workers=1, llm_workers=1, max_buffered=1,
+            workspace=WorkspaceManager(root=str(tmp_path / "workspaces")),
+            output_dir=str(tmp_path / "outputs"), output_formats=["markdown"]
+        )
+
+    return run, clones
+
+def test_batch_documents_each_repository_once(batch):
+    run, clones = batch
+    manifest = run()
+    repos = manifest["repos"]
+
+    assert manifest["duplicates"] == {"https://github.com/example/alpha.git": "https://github.com/example/alpha"}
+    assert repos["https://github.com/example/broken"]["status"] == "error"
+    assert repos["https://github.com/example/broken"]["failed_stage"] == "clone"
+
+    outputs = []
+    for url in ("https://github.com/example/alpha", "https://github.com/other/alpha"):
+        entry = repos[url]
+        assert entry["status"] == "success"
+        assert set(entry["timings"]) >= {"clone", "parse", "analyze", "render", "total"}
+        assert entry["analysis_plan"]["llm_calls"] > 0
+        assert os.path.exists(entry["outputs"]["markdown"])
+        outputs.append(entry["outputs"]["markdown"])
+    # Repositories with the same name still get their own output directory
+    assert len(set(outputs)) == 2
+
+    assert FakeConnector.prompts
+    assert manifest["workspace"]["active"] == 0
+    assert manifest["workspace"]["checkouts"] == 0
+
+def test_batch_resumes_from_its_manifest(batch):
+    run, clones = batch
+    run()
+    cloned = len(clones)
+    manifest = run()
+
+    # Only the failed repository is attempted again
+    assert clones[cloned:] == ["https://github.com/example/broken"]
+    assert manifest["repos"]["https://github.com/example/broken"]["attempts"] == 2
+    assert manifest["repos"]["https://github.com/example/alpha"]["status"] == "success"
+
+def test_manifest_is_valid_json_after_a_run(batch, tmp_path):
+    run, _ = batch
+    run()
+    with open(tmp_path / "manifest.json", encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert {entry["status"] for entry in manifest["repos"].values()} == {"success", "error"}
@@ -0,0 +1,103 @@
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+pytest.importorskip("google.generativeai")
+
+from llm_scheduler import DeadlineExceeded, LLMScheduler, PRIORITY_FILE, PRIORITY_FUNCTION
+
+class GatedConnector:
+    """Records prompts in dispatch order; the first call waits until open() so a backlog can build up."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.order = []
+        self._gate = threading.Event()
+        self._lock = threading.Lock()
+
+    def open(self):
+        self._gate.set()
+
+    def generate_text(self, prompt, temperature=0.7):
+        self._gate.wait()
+        with self._lock:
+            self.order.append(prompt)
+        time.sleep(self.delay)
+        return f"done {prompt}"
+
+@pytest.fixture
+def connector():
+    return GatedConnector()
+
+@pytest.fixture
+def scheduler(connector):
+    scheduler = LLMScheduler(connector, workers=1)
+    yield scheduler
+    connector.open()
+    scheduler.shutdown()
+
+def test_small_job_is_not_starved_by_large_backlog(connector, scheduler):
+    big = scheduler.register_job("big")
+    big_futures = [big.submit(f"big-{i}") for i in range(50)]
+    small = scheduler.register_job("small")
+    small_futures = [small.submit(f"small-{i}") for i in range(3)]
+    connector.open()
+
+    for future in small_futures + big_futures:
+        future.result(timeout=5)
+    last_small = max(connector.order.index(f"small-{i}") for i in range(3))
+    assert last_small < 10
+
+def test_file_prompts_run_before_function_prompts(connector, scheduler):
+    job = scheduler.register_job("job")
+    blocker = job.submit("blocker", priority=PRIORITY_FILE)
+    functions = [job.submit(f"function-{i}", priority=PRIORITY_FUNCTION) for i in range(3)]
+    files = [job.submit(f"file-{i}", priority=PRIORITY_FILE) for i in range(3)]
+    connector.open()
+
+    for future in [blocker] + functions + files:
+        future.result(timeout=5)
+    assert connector.order[1:4] == ["file-0", "file-1", "file-2"]
+
+def test_prompts_past_the_deadline_are_dropped():
+    connector = GatedConnector(delay=0.05)
+    connector.open()
+    scheduler = LLMScheduler(connector, workers=1)
+    try:
+        with scheduler.register_job("job", deadline_seconds=0.2) as job:
+            futures = [job.submit(f"prompt-{i}") for i in range(20)]
+            done, dropped = 0, 0
+            for future in futures:
+                try:
+                    future.result(timeout=5)
+                    done += 1
+                except DeadlineExceeded:
+                    dropped += 1
+            assert done > 0 and dropped > 0
+            assert job.stats()["dropped"] == dropped
+
+            with pytest.raises(DeadlineExceeded):
+                job.submit("late").result(timeout=1)
+    finally:
+        scheduler.shutdown()
+
+def test_closing_a_job_cancels_its_queued_prompts(connector, scheduler):
+    job = scheduler.register_job("job")
+    running = job.submit("running")
+    queued = [job.submit(f"queued-{i}") for i in range(3)]
+    time.sleep(0.05)
+    job.close()
+    connector.open()
+
+    assert running.result(timeout=5) == "done running"
+    assert all(future.cancelled() for future in queued)
+
+def test_duplicate_job_ids_are_rejected(scheduler):
+    scheduler.register_job("job")
+    with pytest.raises(ValueError):
+        scheduler.register_job("job")
@@ -0,0 +1,112 @@
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+pytest.importorskip("networkx")
+pytest.importorskip("git")
+pytest.importorskip("google.generativeai")
+
+from llm_scheduler import LLMScheduler
+from planner import (
+    MAX_FUNCTION_PROMPTS, classify_file, plan_analysis, score_files, summarize_plan, template_summary
+)
+from repo_parser import analyze_code_with_ai, build_graph
+
+def _file(functions=(), classes=(), imports=(), code='x = 1\n' * 100):
+    return {
+        'language': 'PY',
+        'code': code,
+        'functions': list(functions),
+        'classes': list(classes),
+        'imports': list(imports),
+    }
+
+@pytest.fixture
+def context():
+    return {
+        'core.py': _file(functions=[f'f{i}' for i in range(8)], classes=['Core']),
+        'app.py': _file(functions=['main', 'run'], imports=['core']),
+        'cli.py': _file(functions=['parse'], imports=['core']),
+        'tests/test_core.py': _file(functions=['test_a', 'test_b'], imports=['core']),
+        'gen/models_pb2.py': _file(functions=['Model']),
+        'pkg/__init__.py': _file(code=''),
+    }
+
+def test_classify_file(context):
+    assert classify_file('tests/test_core.py', context['tests/test_core.py']) == 'test'
+    assert classify_file('gen/models_pb2.py', context['gen/models_pb2.py']) == 'generated'
+    assert classify_file('pkg/__init__.py', context['pkg/__init__.py']) == 'trivial'
+    assert classify_file('core.py', context['core.py']) == 'source'
+
+def test_imported_files_rank_first_and_tests_rank_low(context):
+    ranked = [entry['file'] for entry in score_files(context, build_graph(context))]
+    assert ranked[0] == 'core.py'
+    assert ranked.index('tests/test_core.py') > ranked.index('cli.py')
+    assert set(ranked[-2:]) == {'gen/models_pb2.py', 'pkg/__init__.py'}
+
+def test_no_budget_analyzes_every_file(context):
+    plan = plan_analysis(context, build_graph(context))
+    assert {file_plan['mode'] for file_plan in plan.values()} == {'ai'}
+    assert plan['core.py']['function_prompts'] == MAX_FUNCTION_PROMPTS
+
+@pytest.mark.parametrize('max_calls', [0, 1, 3, 7, 12])
+def test_call_budget_is_never_exceeded(context, max_calls):
+    plan = plan_analysis(context, build_graph(context), max_calls=max_calls)
+    summary = summarize_plan(plan)
+    assert summary['llm_calls'] <= max_calls
+    assert summary['ai'] + summary['template'] == len(context)
+
+def test_budget_goes_to_top_ranked_files(context):
+    plan = plan_analysis(context, build_graph(context), max_calls=3)
+    assert plan['core.py']['mode'] == 'ai'
+    assert plan['core.py']['function_prompts'] == 2
+    assert all(plan[f]['mode'] == 'template' for f in plan if f != 'core.py')
+    assert plan['gen/models_pb2.py']['mode'] == 'template'
+
+def test_time_budget_scales_with_concurrency(context):
+    graph = build_graph(context)
+    serial = plan_analysis(context, graph, max_seconds=6, seconds_per_call=3)
+    parallel = plan_analysis(context, graph, max_seconds=6, concurrency=2, seconds_per_call=3)
+    assert summarize_plan(serial)['llm_calls'] <= 2
+    assert summarize_plan(parallel)['llm_calls'] <= 4
+    assert summarize_plan(parallel)['llm_calls'] > summarize_plan(serial)['llm_calls']
+
+def test_template_summary_names_the_reason(context):
+    assert 'test file' in template_summary(context['tests/test_core.py'], 'Python', 'test')
+    summary = template_summary(context['core.py'], 'Python')
+    assert 'analysis budget' in summary and '`Core`' in summary
+
+def test_planned_template_files_make_no_llm_calls(context):
+    class CountingConnector:
+        calls = 0
+
+        def generate_text(self, prompt, temperature=0.7):
+            CountingConnector.calls += 1
+            return 'analysis'
+
+    plan = plan_analysis(context, build_graph(context), max_calls=3)
+    enhanced = analyze_code_with_ai(context, CountingConnector(), plan)
+    assert CountingConnector.calls == 3
+    assert enhanced['cli.py']['ai_analysis'].startswith('Python file')
+
+def test_files_dropped_at_the_deadline_get_template_summaries(context):
+    class SlowConnector:
+        def generate_text(self, prompt, temperature=0.7):
+            time.sleep(0.2)
+            return 'analysis'
+
+    scheduler = LLMScheduler(SlowConnector(), workers=1)
+    try:
+        with scheduler.register_job('job', deadline_seconds=0.3) as job:
+            enhanced = analyze_code_with_ai(context, job, plan_analysis(context, build_graph(context)))
+    finally:
+        scheduler.shutdown()
+
+    analyses = [data['ai_analysis'] for data in enhanced.values()]
+    assert 'analysis' in analyses
+    assert not any(a.startswith('AI analysis failed') for a in analyses)
+    assert any(a.startswith('Python file') for a in analyses)
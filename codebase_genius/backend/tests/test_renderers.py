@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+pytest.importorskip("networkx")
+pytest.importorskip("git")
+pytest.importorskip("google.generativeai")
+
+from repo_parser import build_graph
+from renderers import SiteBackend, render_docs
+
+def _file(functions=(), classes=()):
+    return {
+        'language': 'PY',
+        'code': '',
+        'functions': list(functions),
+        'classes': list(classes),
+        'imports': [],
+        'ai_analysis': 'summary',
+        'function_descriptions': {},
+    }
+
+def test_page_names_do_not_collide():
+    directories = ['', 'root', 'a/b', 'a__b', 'a_b', 'a b']
+    names = [SiteBackend.page_name(d) for d in directories]
+    assert SiteBackend.page_name('') == 'root.md'
+    assert len(set(names)) == len(directories)
+
+def test_site_renders_top_level_and_root_dir_separately(tmp_path):
+    context = {
+        'setup.py': _file(functions=['main']),
+        'root/app.py': _file(functions=['run'], classes=['App']),
+    }
+    graph = build_graph(context)
+    repo_url = 'https://github.com/example/project'
+
+    first = render_docs(graph, repo_url, context, output_dir=str(tmp_path), backends=['site'])['site']
+    site_dir = os.path.dirname(first['path'])
+    pages = sorted(os.listdir(os.path.join(site_dir, 'pages')))
+    assert len(pages) == 2
+    assert 'root.md' in pages
+
+    with open(os.path.join(site_dir, 'pages', 'root.md'), encoding='utf-8') as f:
+        top_level = f.read()
+    assert 'setup.py' in top_level
+    assert 'root/app.py' not in top_level
+
+    second = render_docs(graph, repo_url, context, output_dir=str(tmp_path), backends=['site'])['site']
+    assert second['pages_written'] == 0
+    assert second['pages_unchanged'] == first['pages']
+
+def test_pages_rendered_in_worker_processes_match_serial_render(tmp_path):
+    context = {f'pkg{i}/mod.py': _file(functions=[f'f{i}'], classes=[f'C{i}']) for i in range(4)}
+    context['main.py'] = _file(functions=['main'])
+    graph = build_graph(context)
+    repo_url = 'https://github.com/example/project'
+
+    parallel = render_docs(graph, repo_url, context, output_dir=str(tmp_path / 'parallel'),
+                           backends=['site'], workers=2)['site']
+    assert parallel['pages_written'] == 6
+
+    analysis = {'repo_url': repo_url, 'code_graph': graph, 'enhanced_context': context}
+    serial_dir = tmp_path / 'serial'
+    SiteBackend().render(analysis, str(serial_dir))
+
+    parallel_pages = os.path.join(os.path.dirname(parallel['path']), 'pages')
+    for name in os.listdir(parallel_pages):
+        with open(os.path.join(parallel_pages, name), encoding='utf-8') as f:
+            expected = (serial_dir / 'site' / 'pages' / name).read_text(encoding='utf-8')
+            assert f.read() == expected
@@ -0,0 +1,112 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'python'))
+
+pytest.importorskip("networkx")
+pytest.importorskip("git")
+pytest.importorskip("google.generativeai")
+
+import workspace
+from workspace import WorkspaceManager
+
+SIZES = {}
+
+@pytest.fixture
+def clones(monkeypatch):
+    """Replace git clones with a directory holding one file of SIZES[url] bytes."""
+    calls = []
+
+    def fake_clone(repo_url, dest=None):
+        calls.append(repo_url)
+        os.makedirs(os.path.join(dest, ".git"), exist_ok=True)
+        with open(os.path.join(dest, "data"), "wb") as f:
+            f.write(b"x" * SIZES.get(repo_url, 1000))
+        return dest
+
+    monkeypatch.setattr(workspace, "clone_repo", fake_clone)
+    monkeypatch.setattr(WorkspaceManager, "_refresh", lambda self, path: True)
+    return calls
+
+def _manager(root, **kwargs):
+    kwargs.setdefault("quota_bytes", 10_000)
+    kwargs.setdefault("quota_wait_seconds", 0.2)
+    return WorkspaceManager(root=str(root), **kwargs)
+
+def test_job_checkout_is_removed_on_release(tmp_path, clones):
+    manager = _manager(tmp_path)
+    with manager.checkout("https://github.com/example/a") as path:
+        assert os.path.exists(os.path.join(path, "data"))
+    assert not os.path.exists(path)
+    assert manager.metrics()["used_bytes"] == 0
+
+def test_reused_checkout_is_evicted_least_recently_used_first(tmp_path, clones):
+    manager = _manager(tmp_path, reuse=True, quota_bytes=2500)
+    paths = []
+    for name in ("a", "b", "c"):
+        with manager.checkout(f"https://github.com/example/{name}") as path:
+            paths.append(path)
+    assert [os.path.exists(p) for p in paths] == [False, True, True]
+    assert manager.metrics()["evictions"] == 1
+
+def test_holders_in_one_process_share_a_checkout(tmp_path, clones, monkeypatch):
+    manager = _manager(tmp_path, reuse=True)
+    url = "https://github.com/example/a"
+    first = manager.acquire(url)
+    # A failed refresh must not delete a checkout another job is reading
+    monkeypatch.setattr(WorkspaceManager, "_refresh", lambda self, path: False)
+    second = manager.acquire(url)
+    assert first == second and os.path.exists(os.path.join(first, "data"))
+    assert clones == [url]
+    manager.release(first)
+    manager.release(second)
+
+def test_other_process_cannot_evict_a_pinned_checkout(tmp_path, clones):
+    owner = _manager(tmp_path, reuse=True, quota_bytes=1500)
+    pinned = owner.acquire("https://github.com/example/a")
+
+    # A second manager on the same root adopts the pinned checkout as idle
+    other = _manager(tmp_path, reuse=True, quota_bytes=1500)
+    with other.checkout("https://github.com/example/b"):
+        pass
+    assert os.path.exists(os.path.join(pinned, "data"))
+    assert other.metrics()["evictions_skipped"] == 1
+    owner.release(pinned)
+
+def test_other_process_shares_a_pinned_checkout_without_recloning(tmp_path, clones, monkeypatch):
+    url = "https://github.com/example/a"
+    owner = _manager(tmp_path, reuse=True)
+    pinned = owner.acquire(url)
+
+    monkeypatch.setattr(WorkspaceManager, "_refresh", lambda self, path: False)
+    other = _manager(tmp_path, reuse=True)
+    assert other.acquire(url) == pinned
+    other.release(pinned, success=False)
+    assert os.path.exists(os.path.join(pinned, "data"))
+    assert clones == [url]
+    owner.release(pinned)
+
+def test_rejected_clone_still_deletes_evicted_checkouts(tmp_path, clones):
+    manager = _manager(tmp_path, reuse=True)
+    with manager.checkout("https://github.com/example/idle") as idle:
+        pass
+    busy = manager.acquire("https://github.com/example/busy")
+
+    manager.quota_bytes = 1000
+    with pytest.raises(RuntimeError) as excinfo:
+        manager.acquire("https://github.com/example/new")
+    assert "0 MB" not in str(excinfo.value)
+    assert not os.path.exists(idle)
+    assert manager.metrics()["used_bytes"] == 1000
+    manager.release(busy)
+
+def test_clone_waits_for_space_then_fails(tmp_path, clones):
+    manager = _manager(tmp_path, quota_bytes=1500)
+    path = manager.acquire("https://github.com/example/a")
+    with pytest.raises(RuntimeError):
+        manager.acquire("https://github.com/example/b")
+    metrics = manager.metrics()
+    assert metrics["quota_rejections"] == 1 and metrics["quota_waits"] >= 1
+    manager.release(path)